@@ -1,25 +1,79 @@
 from mcp.server.fastmcp import FastMCP, Context
+from mcp.server.sse import SseServerTransport
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route
 from contextlib import asynccontextmanager
 from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from dotenv import load_dotenv
 from mem0 import Memory
 import asyncio
-import json
+import operator
+import orjson
+import uvicorn
 import os
 
-from utils import get_mem0_client
+try:
+    import uvloop
+except ImportError:
+    # uvloop isn't available on Windows, where the default asyncio event loop is used instead
+    uvloop = None
+
+from utils import (
+    get_mem0_client,
+    get_memory_texts,
+    memory_digest,
+    normalize_memory,
+    MemoryFingerprints,
+    SemanticQueryCache,
+    WriteBatcher
+)
 
 load_dotenv()
 
 # Default user ID for memory operations
 DEFAULT_USER_ID = "user"
 
+# Thread pool that runs mem0's blocking calls. Each in-flight tool call holds a thread for its whole LLM and
+# database round trip, so this is sized well above asyncio's default of min(32, CPU count + 4) threads.
+executor = ThreadPoolExecutor(max_workers=int(os.getenv("MAX_WORKER_THREADS") or 64), thread_name_prefix="mem0")
+
+# Cache of recent search results, shared by every client session so writes can invalidate it
+search_cache = SemanticQueryCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD") or 0.95),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE") or 1000),
+    ttl=float(os.getenv("SEMANTIC_CACHE_TTL") or 60)
+)
+
+# Fingerprints of stored memories, used to skip writes of content that is already stored
+memory_fingerprints = MemoryFingerprints()
+
+def _add_memories(texts: list[str]):
+    """Save several texts with one mem0 add, which extracts memories from all of them in a single LLM call."""
+    messages = [{"role": "user", "content": text} for text in texts]
+    return get_mem0_client().add(messages, user_id=DEFAULT_USER_ID)
+
+# Optionally coalesces saves that arrive within a short window into one mem0 add. Off by default since
+# mem0 then extracts memories from the batched texts together, as if they were one conversation.
+write_batch_window = float(os.getenv("WRITE_BATCH_WINDOW_MS") or 0) / 1000
+write_batcher = WriteBatcher(
+    _add_memories,
+    max_size=int(os.getenv("WRITE_BATCH_SIZE") or 16),
+    max_wait=write_batch_window
+) if write_batch_window > 0 else None
+
+# Pulls the memory text out of a mem0 result item
+_get_memory_text = operator.itemgetter("memory")
+
 # Create a dataclass for our application context
 @dataclass
 class Mem0Context:
     """Context for the Mem0 MCP server."""
     mem0_client: Memory
+    search_cache: SemanticQueryCache
+    memory_fingerprints: MemoryFingerprints
+    write_batcher: WriteBatcher | None
 
 @asynccontextmanager
 async def mem0_lifespan(server: FastMCP) -> AsyncIterator[Mem0Context]:
@@ -30,13 +84,23 @@ async def mem0_lifespan(server: FastMCP) -> AsyncIterator[Mem0Context]:
         server: The FastMCP server instance
         
     Yields:
-        Mem0Context: The context containing the Mem0 client
+        Mem0Context: The context containing the Mem0 client and its caches
     """
-    # Create and return the Memory client with the helper function in utils.py
-    mem0_client = get_mem0_client()
+    # asyncio.to_thread runs on the loop's default executor, so point it at the sized pool
+    asyncio.get_running_loop().set_default_executor(executor)
+
+    # Get the Memory client with the helper function in utils.py. The lifespan runs once per
+    # client session, so the helper caches the client rather than rebuilding it for each session.
+    # The first build connects to the database, so wait for it off the event loop.
+    mem0_client = await asyncio.to_thread(get_mem0_client)
     
     try:
-        yield Mem0Context(mem0_client=mem0_client)
+        yield Mem0Context(
+            mem0_client=mem0_client,
+            search_cache=search_cache,
+            memory_fingerprints=memory_fingerprints,
+            write_batcher=write_batcher
+        )
     finally:
         # No explicit cleanup needed for the Mem0 client
         pass
@@ -63,12 +127,61 @@ async def save_memory(ctx: Context, text: str) -> str:
     """
     try:
         mem0_client = ctx.request_context.lifespan_context.mem0_client
-        messages = [{"role": "user", "content": text}]
-        mem0_client.add(messages, user_id=DEFAULT_USER_ID)
-        return f"Successfully saved memory: {text[:100]}..." if len(text) > 100 else f"Successfully saved memory: {text}"
+        memory_fingerprints = await _get_memory_fingerprints(ctx.request_context.lifespan_context)
+        # Saving the same content again would only repeat the LLM extraction, so skip it
+        if memory_fingerprints.contains(DEFAULT_USER_ID, text):
+            return f"Memory already exists: {_preview(text)}"
+
+        write_batcher = ctx.request_context.lifespan_context.write_batcher
+        if write_batcher:
+            # Wait for the batched add this save is grouped into
+            result = await write_batcher.submit(text)
+        else:
+            messages = [{"role": "user", "content": text}]
+            # mem0's client is synchronous, so run it off the event loop to keep other tool calls flowing
+            result = await asyncio.to_thread(mem0_client.add, messages, user_id=DEFAULT_USER_ID)
+        _record_saved(memory_fingerprints, result, [text])
+        # New memories can change any search result, so cached results are no longer valid
+        ctx.request_context.lifespan_context.search_cache.clear()
+        return f"Successfully saved memory: {_preview(text)}"
     except Exception as e:
         return f"Error saving memory: {str(e)}"
 
+@mcp.tool()
+async def save_memory_batch(ctx: Context, texts: list[str]) -> str:
+    """Save several pieces of information to your long-term memory at once.
+
+    Use this instead of calling save_memory repeatedly when you have more than one thing to remember.
+    All of the content is processed together in a single pass, which is much faster than saving each item separately.
+
+    Args:
+        ctx: The MCP server provided context which includes the Mem0 client
+        texts: The pieces of content to store in memory, each including any relevant details and context
+    """
+    try:
+        if not texts:
+            return "No memories to save"
+
+        mem0_client = ctx.request_context.lifespan_context.mem0_client
+        memory_fingerprints = await _get_memory_fingerprints(ctx.request_context.lifespan_context)
+        # Drop repeats within the batch, compared the same way as stored content, keeping the first of each
+        batch = {}
+        for text in texts:
+            batch.setdefault(memory_digest(normalize_memory(text)), text)
+        # Then drop content that has already been saved
+        new_texts = [text for text in batch.values() if not memory_fingerprints.contains(DEFAULT_USER_ID, text)]
+        if not new_texts:
+            return "All memories already exist"
+
+        messages = [{"role": "user", "content": text} for text in new_texts]
+        # A single add extracts memories from every message with one LLM call
+        result = await asyncio.to_thread(mem0_client.add, messages, user_id=DEFAULT_USER_ID)
+        _record_saved(memory_fingerprints, result, new_texts)
+        ctx.request_context.lifespan_context.search_cache.clear()
+        return f"Successfully saved {len(new_texts)} memories"
+    except Exception as e:
+        return f"Error saving memories: {str(e)}"
+
 @mcp.tool()
 async def get_all_memories(ctx: Context) -> str:
     """Get all stored memories for the user.
@@ -83,12 +196,9 @@ async def get_all_memories(ctx: Context) -> str:
     """
     try:
         mem0_client = ctx.request_context.lifespan_context.mem0_client
-        memories = mem0_client.get_all(user_id=DEFAULT_USER_ID)
-        if isinstance(memories, dict) and "results" in memories:
-            flattened_memories = [memory["memory"] for memory in memories["results"]]
-        else:
-            flattened_memories = memories
-        return json.dumps(flattened_memories, indent=2)
+        memories = await asyncio.to_thread(mem0_client.get_all, user_id=DEFAULT_USER_ID)
+        flattened_memories = _deduplicate_memories(_flatten_memories(memories))
+        return orjson.dumps(flattened_memories, option=orjson.OPT_INDENT_2).decode()
     except Exception as e:
         return f"Error retrieving memories: {str(e)}"
 
@@ -105,24 +215,155 @@ async def search_memories(ctx: Context, query: str, limit: int = 3) -> str:
         limit: Maximum number of results to return (default: 3)
     """
     try:
-        mem0_client = ctx.request_context.lifespan_context.mem0_client
-        memories = mem0_client.search(query, user_id=DEFAULT_USER_ID, limit=limit)
-        if isinstance(memories, dict) and "results" in memories:
-            flattened_memories = [memory["memory"] for memory in memories["results"]]
-        else:
-            flattened_memories = memories
-        return json.dumps(flattened_memories, indent=2)
+        flattened_memories = await _search(ctx.request_context.lifespan_context, query, limit)
+        return orjson.dumps(flattened_memories, option=orjson.OPT_INDENT_2).decode()
+    except Exception as e:
+        return f"Error searching memories: {str(e)}"
+
+@mcp.tool()
+async def search_memory_batch(ctx: Context, queries: list[str], limit: int = 3) -> str:
+    """Search memories for several queries at once using semantic search.
+
+    Use this instead of calling search_memories repeatedly when you have more than one thing to look up.
+    The searches run concurrently and are returned in a single response.
+
+    Args:
+        ctx: The MCP server provided context which includes the Mem0 client
+        queries: Search query strings describing what you're looking for. Can be natural language.
+        limit: Maximum number of results to return per query (default: 3)
+
+    Returns a JSON formatted list with one entry per query, in the same order as the queries.
+    """
+    try:
+        mem0_context = ctx.request_context.lifespan_context
+        results = await asyncio.gather(*[_search(mem0_context, query, limit) for query in queries])
+        return orjson.dumps(
+            [{"query": query, "memories": memories} for query, memories in zip(queries, results)],
+            option=orjson.OPT_INDENT_2
+        ).decode()
     except Exception as e:
         return f"Error searching memories: {str(e)}"
 
-async def main():
+async def _search(mem0_context: Mem0Context, query: str, limit: int) -> list:
+    """Run a single semantic search, serving it from the search cache when possible."""
+    mem0_client = mem0_context.mem0_client
+    search_cache = mem0_context.search_cache
+    # Read before searching, so results are only cached if no write cleared the cache in the meantime
+    generation = search_cache.generation
+
+    # An exact repeat of a cached query is answered without embedding it
+    cached_memories = search_cache.get_exact(query, limit)
+    if cached_memories is not None:
+        return cached_memories
+
+    # Serve semantically equivalent repeat queries from the cache. The embedding is memoized,
+    # so on a miss mem0's search below reuses it instead of embedding the query again.
+    query_vector = await asyncio.to_thread(mem0_client.embedding_model.embed, query, "search")
+    cached_memories = search_cache.get(query_vector, limit)
+    if cached_memories is not None:
+        return cached_memories
+
+    memories = await asyncio.to_thread(mem0_client.search, query, user_id=DEFAULT_USER_ID, limit=limit)
+    flattened_memories = _flatten_memories(memories)
+    search_cache.put(query, query_vector, limit, flattened_memories, generation)
+    return flattened_memories
+
+async def _get_memory_fingerprints(mem0_context: Mem0Context) -> MemoryFingerprints:
+    """Get the fingerprints of stored memories, loading them from mem0 first if needed."""
+    memory_fingerprints = mem0_context.memory_fingerprints
+    if not memory_fingerprints.is_loaded(DEFAULT_USER_ID):
+        # One fetch of the stored memories replaces a lookup against them for every later save
+        memory_texts = await asyncio.to_thread(
+            get_memory_texts,
+            mem0_context.mem0_client.vector_store,
+            DEFAULT_USER_ID,
+            memory_fingerprints.max_entries
+        )
+        memory_fingerprints.load(DEFAULT_USER_ID, memory_texts)
+    return memory_fingerprints
+
+def _record_saved(memory_fingerprints: MemoryFingerprints, result, texts: list) -> None:
+    """Record the fingerprints of saved texts if the save added memories, unless it changed stored ones."""
+    results = result["results"] if isinstance(result, dict) else result
+    events = {item.get("event") for item in results or []}
+    if "UPDATE" in events or "DELETE" in events:
+        # mem0 rewrote or removed stored memories, so content fingerprinted earlier may no longer be stored.
+        # Forget it all and reload from the store on the next save.
+        memory_fingerprints.forget(DEFAULT_USER_ID)
+    elif "ADD" in events:
+        for text in texts:
+            memory_fingerprints.add(DEFAULT_USER_ID, text)
+    # Otherwise mem0 stored nothing, so a later save of the same text should still reach it
+
+def _preview(text: str) -> str:
+    """Shorten saved content to its first 100 characters for a tool response."""
+    return text if len(text) <= 100 else text[:100] + "..."
+
+def _flatten_memories(memories) -> list:
+    """Reduce a mem0 get_all or search response to the list of memory texts."""
+    # The v1.0 API returns the list of memory items itself rather than wrapping it in "results"
+    if isinstance(memories, dict) and "results" in memories:
+        memories = memories["results"]
+    return list(map(_get_memory_text, memories))
+
+def _deduplicate_memories(memories: list) -> list:
+    """Drop repeated memory texts in a single pass, keeping the first occurrence of each."""
+    # Key on the normalized text so copies that differ only in case or whitespace are dropped too
+    unique_memories = {}
+    for memory in memories:
+        unique_memories.setdefault(memory_digest(normalize_memory(memory)), memory)
+    return list(unique_memories.values())
+
+def create_app() -> Starlette:
+    """
+    Create the ASGI app that serves the MCP server over SSE.
+
+    This is the single entry point for the SSE transport. It can also be served directly with
+    `uvicorn main:create_app --factory --app-dir src`.
+
+    Returns:
+        Starlette: The app exposing the SSE stream at /sse and client messages at /messages/
+    """
+    # Start building the mem0 client while the server starts up and waits for its first client
+    executor.submit(get_mem0_client)
+
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request):
+        async with sse.connect_sse(request.scope, request.receive, request._send) as streams:
+            await mcp._mcp_server.run(streams[0], streams[1], mcp._mcp_server.create_initialization_options())
+
+    return Starlette(
+        debug=mcp.settings.debug,
+        routes=[
+            Route("/sse", endpoint=handle_sse),
+            Mount("/messages/", app=sse.handle_post_message)
+        ]
+    )
+
+def main():
     transport = os.getenv("TRANSPORT", "sse")
     if transport == 'sse':
-        # Run the MCP server with sse transport
-        await mcp.run_sse_async()
+        # Run the MCP server with sse transport, using uvloop automatically when it's installed and
+        # the C-based httptools parser. This stays a single worker process since SSE sessions live in
+        # the memory of the process that opened them (see "Scaling" in the README).
+        uvicorn.run(
+            create_app,
+            factory=True,
+            host=mcp.settings.host,
+            port=mcp.settings.port,
+            http="httptools",
+            backlog=2048,
+            log_level=mcp.settings.log_level.lower()
+        )
     else:
-        # Run the MCP server with stdio transport
-        await mcp.run_stdio_async()
+        # Run the MCP server with stdio transport, building the mem0 client during the client's handshake
+        executor.submit(get_mem0_client)
+        # uvloop's libuv-based event loop has much lower per-call overhead than the default loop
+        if uvloop:
+            uvloop.run(mcp.run_stdio_async())
+        else:
+            asyncio.run(mcp.run_stdio_async())
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -1,4 +1,19 @@
+from collections import OrderedDict
 from mem0 import Memory
+from mem0.vector_stores.supabase import OutputData
+from openai import OpenAI
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+import numpy as np
+import asyncio
+import copy
+import functools
+import hashlib
+import httpx
+import threading
+import time
+import unicodedata
+import uuid
 import os
 
 # Custom instructions for memory processing
@@ -14,7 +29,24 @@ Extract the Following Information:
 - Source: Record where this information came from when applicable.
 """
 
-def get_mem0_client():
+# LLM settings for each supported LLM_PROVIDER. The model comes from LLM_CHOICE.
+_LLM_TEMPLATES = {
+    "openai": {"provider": "openai", "config": {"temperature": 0.2, "max_tokens": 2000}},
+    # OpenRouter serves an OpenAI-compatible API
+    "openrouter": {"provider": "openai", "config": {"temperature": 0.2, "max_tokens": 2000}},
+    "ollama": {"provider": "ollama", "config": {"temperature": 0.2, "max_tokens": 2000}},
+}
+
+# Embedder settings for each LLM_PROVIDER that serves embeddings, with the default model.
+# EMBEDDING_MODEL_CHOICE overrides the model.
+_EMBEDDER_TEMPLATES = {
+    "openai": {"provider": "openai", "config": {"model": "text-embedding-3-small", "embedding_dims": 1536}},
+    "ollama": {"provider": "ollama", "config": {"model": "nomic-embed-text", "embedding_dims": 768}},
+}
+
+# Cached so the environment is read, and API keys are exported to it, exactly once per process
+@functools.cache
+def get_mem0_config():
     # Get LLM provider and configuration
     llm_provider = os.getenv('LLM_PROVIDER')
     llm_api_key = os.getenv('LLM_API_KEY')
@@ -24,18 +56,18 @@ def get_mem0_client():
     # Initialize config dictionary
     config = {}
     
-    # Configure LLM based on provider
+    # Configure LLM and embedder based on provider, copying the templates so they're never modified
+    if llm_provider in _LLM_TEMPLATES:
+        config["llm"] = copy.deepcopy(_LLM_TEMPLATES[llm_provider])
+        config["llm"]["config"]["model"] = llm_model
+
+    if llm_provider in _EMBEDDER_TEMPLATES:
+        config["embedder"] = copy.deepcopy(_EMBEDDER_TEMPLATES[llm_provider])
+        if embedding_model:
+            config["embedder"]["config"]["model"] = embedding_model
+
     if llm_provider == 'openai' or llm_provider == 'openrouter':
-        config["llm"] = {
-            "provider": "openai",
-            "config": {
-                "model": llm_model,
-                "temperature": 0.2,
-                "max_tokens": 2000,
-            }
-        }
-        
-        # Set API key in environment if not already set
+        # Set API key in environment if not already set. The OpenAI embedder reads it from there too.
         if llm_api_key and not os.environ.get("OPENAI_API_KEY"):
             os.environ["OPENAI_API_KEY"] = llm_api_key
             
@@ -44,47 +76,11 @@ def get_mem0_client():
             os.environ["OPENROUTER_API_KEY"] = llm_api_key
     
     elif llm_provider == 'ollama':
-        config["llm"] = {
-            "provider": "ollama",
-            "config": {
-                "model": llm_model,
-                "temperature": 0.2,
-                "max_tokens": 2000,
-            }
-        }
-        
         # Set base URL for Ollama if provided
         llm_base_url = os.getenv('LLM_BASE_URL')
         if llm_base_url:
             config["llm"]["config"]["ollama_base_url"] = llm_base_url
-    
-    # Configure embedder based on provider
-    if llm_provider == 'openai':
-        config["embedder"] = {
-            "provider": "openai",
-            "config": {
-                "model": embedding_model or "text-embedding-3-small",
-                "embedding_dims": 1536  # Default for text-embedding-3-small
-            }
-        }
-        
-        # Set API key in environment if not already set
-        if llm_api_key and not os.environ.get("OPENAI_API_KEY"):
-            os.environ["OPENAI_API_KEY"] = llm_api_key
-    
-    elif llm_provider == 'ollama':
-        config["embedder"] = {
-            "provider": "ollama",
-            "config": {
-                "model": embedding_model or "nomic-embed-text",
-                "embedding_dims": 768  # Default for nomic-embed-text
-            }
-        }
-        
-        # Set base URL for Ollama if provided
-        embedding_base_url = os.getenv('LLM_BASE_URL')
-        if embedding_base_url:
-            config["embedder"]["config"]["ollama_base_url"] = embedding_base_url
+            config["embedder"]["config"]["ollama_base_url"] = llm_base_url
     
     # Configure Supabase vector store
     config["vector_store"] = {
@@ -97,6 +93,452 @@ def get_mem0_client():
     }
 
     # config["custom_fact_extraction_prompt"] = CUSTOM_INSTRUCTIONS
-    
-    # Create and return the Memory client
-    return Memory.from_config(config)
\ No newline at end of file
+
+    return config
+
+# Held while the client is built, so the startup prewarm and the first session can't each build one
+_mem0_client_lock = threading.Lock()
+
+def get_mem0_client():
+    with _mem0_client_lock:
+        return _create_mem0_client()
+
+# Cached so every client session shares one Memory client (and its database connection and caches)
+@functools.lru_cache(maxsize=1)
+def _create_mem0_client():
+    # Create the Memory client
+    mem0_client = Memory.from_config(get_mem0_config())
+
+    # Have the LLM and embedder share one pool of keep-alive connections
+    share_http_client(mem0_client)
+
+    # Size the database connection pool for concurrent tool calls
+    configure_connection_pool(mem0_client.vector_store)
+
+    # Optionally serve reads from an in-memory mirror of the Supabase collection
+    if os.getenv('LOCAL_VECTOR_INDEX', 'false').lower() == 'true':
+        mem0_client.vector_store = MirroredVectorStore(mem0_client.vector_store)
+
+    # Memoize embeddings so the search cache and mem0's own search share a single embedding call per query
+    mem0_client.embedding_model.embed = functools.lru_cache(maxsize=128)(mem0_client.embedding_model.embed)
+
+    return mem0_client
+
+@functools.lru_cache(maxsize=1)
+def get_http_client():
+    """Get the HTTP client shared by every OpenAI-compatible client mem0 uses."""
+    return httpx.Client(
+        http2=True,
+        follow_redirects=True,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100)
+    )
+
+def share_http_client(mem0_client):
+    """
+    Point the OpenAI clients of mem0's LLM and embedder at the shared HTTP client.
+
+    mem0 builds a separate OpenAI client for each, and each opens its own connections. Sharing one
+    HTTP/2 client lets requests to the same provider reuse a warm TLS connection. Ollama clients
+    talk to a local server and are left as they are.
+    """
+    http_client = get_http_client()
+    for component in (mem0_client.llm, mem0_client.embedding_model):
+        if isinstance(component.client, OpenAI):
+            component.client = component.client.with_options(http_client=http_client)
+
+def configure_connection_pool(vector_store):
+    """
+    Replace the engine of the vecs client behind mem0's Supabase store with a sized connection pool.
+
+    vecs creates its engine with SQLAlchemy's defaults, which caps it at 15 connections and gives no
+    control over the pool. Connections are still reused between operations either way, so this mainly
+    changes how many concurrent tool calls can hold a connection before waiting for one.
+
+    Poolers such as Supabase's close connections that sit idle, so pooled connections are checked
+    before use and replaced after 30 minutes rather than failing the first query after a quiet spell.
+    """
+    client = vector_store.db
+    engine = create_engine(
+        client.engine.url,
+        pool_size=int(os.getenv('DATABASE_POOL_SIZE') or 5),
+        max_overflow=int(os.getenv('DATABASE_MAX_OVERFLOW') or 15),
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=1800
+    )
+    client.engine.dispose()
+    client.engine = engine
+    client.Session = sessionmaker(engine)
+
+def normalize_vector(vector) -> np.ndarray:
+    """Scale an embedding to unit length as float32, so a dot product gives cosine similarity."""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def normalize_memory(text: str) -> str:
+    """Casefold memory text and collapse its whitespace, so trivially different copies compare equal."""
+    # NFKC makes composed and decomposed forms of the same character equal, and casefold handles
+    # characters that lower() doesn't, such as the German ß
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+def memory_digest(normalized: str) -> bytes:
+    """Reduce normalized memory text to a 16-byte BLAKE2b digest for use as a compact key."""
+    return hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+
+class SemanticQueryCache:
+    """
+    In-memory cache of recent search results keyed by query embedding.
+
+    A lookup returns the results of the most similar cached query if its cosine similarity
+    is at least `threshold`, so paraphrased repeats of a query skip the vector store entirely.
+    Repeats of the same query text (ignoring case and whitespace) are found before the query is
+    even embedded. Entries expire `ttl` seconds after they were cached, so writes made outside this
+    process show up, and the least recently used entry is evicted once `max_entries` is reached.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1000, ttl: float = 60):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Normalized query embeddings, one per row, and the time each row expires.
+        # Only the first self._size rows are in use.
+        self._vectors = None
+        self._expires_at = None
+        self._size = 0
+        # Maps a row of self._vectors to (query, limit, results), ordered from least to most recently used
+        self._entries = OrderedDict()
+        # Maps normalized query text to its row
+        self._queries = {}
+        # Bumped by every clear, so a search that started before a write can tell its results are stale
+        self.generation = 0
+
+    def _lookup(self, row: int, limit: int):
+        _, cached_limit, results = self._entries[row]
+        # Results cached for a smaller limit can't answer a larger request
+        if cached_limit < limit or time.monotonic() >= self._expires_at[row]:
+            return None
+
+        self._entries.move_to_end(row)
+        return results[:limit]
+
+    def get_exact(self, query: str, limit: int):
+        """Return cached results for the same query text, or None on a miss."""
+        row = self._queries.get(normalize_memory(query))
+        return None if row is None else self._lookup(row, limit)
+
+    def get(self, vector, limit: int):
+        """Return cached results for a query similar to `vector`, or None on a miss."""
+        if not self._size:
+            return None
+
+        similarities = self._vectors[:self._size] @ normalize_vector(vector)
+        # Expired rows can't be served, so they mustn't hide a valid match that is slightly less similar
+        similarities[self._expires_at[:self._size] <= time.monotonic()] = -np.inf
+        row = int(np.argmax(similarities))
+        if similarities[row] < self.threshold:
+            return None
+        return self._lookup(row, limit)
+
+    def put(self, query: str, vector, limit: int, results: list, generation: int) -> None:
+        """
+        Cache the results returned for `query`, embedded as `vector`.
+
+        `generation` is the value of `self.generation` read before the search ran. If the cache was
+        cleared since then, a write may have landed mid-search, so the results aren't cached.
+        """
+        if self.max_entries <= 0 or generation != self.generation:
+            return
+
+        query = normalize_memory(query)
+        vector = normalize_vector(vector)
+        # A repeated query replaces its own entry rather than taking a second row
+        row = self._queries.get(query)
+        if row is None:
+            if self._size < self.max_entries:
+                row = self._size
+                if self._vectors is None:
+                    self._vectors = np.empty((min(self.max_entries, 64), vector.shape[0]), dtype=np.float32)
+                    self._expires_at = np.empty(self._vectors.shape[0])
+                elif row == self._vectors.shape[0]:
+                    # Grow geometrically up to max_entries so memory follows actual use
+                    grown = np.empty((min(self.max_entries, row * 2), vector.shape[0]), dtype=np.float32)
+                    grown[:row] = self._vectors
+                    self._vectors = grown
+                    self._expires_at = np.resize(self._expires_at, grown.shape[0])
+                self._size += 1
+            else:
+                row, (evicted_query, *_) = self._entries.popitem(last=False)
+                del self._queries[evicted_query]
+
+        self._vectors[row] = vector
+        self._expires_at[row] = time.monotonic() + self.ttl
+        self._entries[row] = (query, limit, results)
+        self._entries.move_to_end(row)
+        self._queries[query] = row
+
+    def clear(self) -> None:
+        """Drop every cached result, e.g. after a write makes them stale."""
+        self._size = 0
+        self._entries.clear()
+        self._queries.clear()
+        self.generation += 1
+
+class MemoryFingerprints:
+    """
+    Per-user record of memory content that is already stored.
+
+    Content is normalized for Unicode form, case and whitespace and reduced to a 16-byte BLAKE2b digest,
+    so checking a new write against everything stored is a set lookup instead of an LLM extraction and
+    vector store round trip. A user's fingerprints are loaded from their stored memories on first use
+    and expire after `ttl` seconds, so changes made elsewhere are picked up on the next load. Each user
+    keeps at most `max_entries` fingerprints, dropping the least recently seen.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Maps a user ID to (time loaded, digests ordered from least to most recently seen)
+        self._users = {}
+
+    @staticmethod
+    def _digest(text: str) -> bytes:
+        return memory_digest(normalize_memory(text))
+
+    def _add(self, digests: OrderedDict, text: str) -> None:
+        digest = self._digest(text)
+        digests[digest] = None
+        digests.move_to_end(digest)
+        if len(digests) > self.max_entries:
+            digests.popitem(last=False)
+
+    def is_loaded(self, user_id: str) -> bool:
+        """Whether the user's fingerprints are loaded and haven't expired."""
+        entry = self._users.get(user_id)
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    def load(self, user_id: str, texts) -> None:
+        """Replace the user's fingerprints with those of their stored memories."""
+        digests = OrderedDict()
+        for text in texts:
+            self._add(digests, text)
+        self._users[user_id] = (time.monotonic(), digests)
+
+    def contains(self, user_id: str, text: str) -> bool:
+        """Whether `text` is already stored for the user."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            return False
+        digests = entry[1]
+        digest = self._digest(text)
+        if digest not in digests:
+            return False
+        digests.move_to_end(digest)
+        return True
+
+    def add(self, user_id: str, text: str) -> None:
+        """Record that `text` has been saved for the user."""
+        # A user that was never loaded gets a placeholder that still counts as unloaded
+        _, digests = self._users.setdefault(user_id, (float("-inf"), OrderedDict()))
+        self._add(digests, text)
+
+    def forget(self, user_id: str) -> None:
+        """Drop the user's fingerprints, so they're loaded from the store again on next use."""
+        self._users.pop(user_id, None)
+
+class MirroredVectorStore:
+    """
+    In-memory mirror of mem0's Supabase vector store.
+
+    Every record is loaded from Supabase once at startup, after which searches, gets and listings
+    are answered from RAM without a database round trip. Writes go to Supabase first and are then
+    applied to the mirror, so Supabase stays the source of truth. Any other method is passed
+    through to the wrapped store.
+
+    The mirror only sees writes made through this process, so it should only be enabled when this
+    server is the sole writer to the collection.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        # mem0 calls the vector store from its own worker threads
+        self._lock = threading.Lock()
+        self._ids = []
+        self._payloads = []
+        self._rows = {}
+        self._free_rows = []
+        self._vectors = np.zeros((0, store.embedding_model_dims), dtype=np.float32)
+        self._load()
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def _load(self) -> None:
+        collection = self.store.collection
+        table = collection.table
+        with collection.client.Session() as session:
+            records = session.execute(select(table.c.id, table.c.vec, table.c.metadata)).all()
+
+        self._vectors = np.zeros((max(len(records), 1), self.store.embedding_model_dims), dtype=np.float32)
+        for record_id, vector, payload in records:
+            self._set(str(record_id), vector, payload or {})
+
+    def _set(self, vector_id: str, vector, payload: dict) -> None:
+        row = self._rows.get(vector_id)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                row = len(self._ids)
+                self._ids.append(None)
+                self._payloads.append(None)
+                if row >= self._vectors.shape[0]:
+                    # Grow geometrically so inserts stay amortised O(1)
+                    self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+            self._rows[vector_id] = row
+
+        self._ids[row] = vector_id
+        self._payloads[row] = payload
+        self._vectors[row] = normalize_vector(vector)
+
+    def _unset(self, vector_id: str) -> None:
+        row = self._rows.pop(vector_id, None)
+        if row is not None:
+            self._ids[row] = None
+            self._payloads[row] = None
+            self._vectors[row] = 0.0
+            self._free_rows.append(row)
+
+    @staticmethod
+    def _matches(payload: dict, filters) -> bool:
+        return not filters or all(payload.get(key) == value for key, value in filters.items())
+
+    def insert(self, vectors, payloads=None, ids=None):
+        # Generate the IDs here rather than in the store so the mirror knows them
+        ids = ids or [str(uuid.uuid4()) for _ in vectors]
+        self.store.insert(vectors=vectors, payloads=payloads, ids=ids)
+        with self._lock:
+            for vector_id, vector, payload in zip(ids, vectors, payloads or [{} for _ in vectors]):
+                self._set(vector_id, vector, payload)
+
+    def update(self, vector_id, vector=None, payload=None):
+        self.store.update(vector_id=vector_id, vector=vector, payload=payload)
+        # The Supabase store only writes when it is given a vector
+        if vector:
+            with self._lock:
+                self._set(vector_id, vector, payload or {})
+
+    def delete(self, vector_id):
+        self.store.delete(vector_id=vector_id)
+        with self._lock:
+            self._unset(vector_id)
+
+    def search(self, query, vectors, limit=5, filters=None):
+        with self._lock:
+            if not self._rows:
+                return []
+            # Scores are cosine distances to match the Supabase store
+            distances = 1.0 - self._vectors[:len(self._ids)] @ normalize_vector(vectors)
+            results = []
+            for row in np.argsort(distances):
+                payload = self._payloads[row]
+                if payload is not None and self._matches(payload, filters):
+                    results.append(OutputData(id=self._ids[row], score=float(distances[row]), payload=payload))
+                    if len(results) == limit:
+                        break
+        return results
+
+    def get(self, vector_id):
+        with self._lock:
+            row = self._rows.get(vector_id)
+            if row is None:
+                return None
+            return OutputData(id=vector_id, score=None, payload=self._payloads[row])
+
+    def list(self, filters=None, limit=100):
+        with self._lock:
+            results = []
+            for vector_id, row in self._rows.items():
+                if len(results) == limit:
+                    break
+                if self._matches(self._payloads[row], filters):
+                    results.append(OutputData(id=vector_id, score=None, payload=self._payloads[row]))
+        # Nested to match the Supabase store's return shape
+        return [results]
+
+def get_memory_texts(vector_store, user_id: str, limit: int) -> list:
+    """
+    Fetch the text of a user's stored memories, for seeding duplicate detection.
+
+    mem0's get_all lists the Supabase collection with a vector query and then fetches every matching
+    row, embedding included, in a second round trip. Only the text is needed here, so this reads just
+    that field in a single query, or straight from RAM when the collection is mirrored.
+    """
+    if isinstance(vector_store, MirroredVectorStore):
+        records = vector_store.list(filters={"user_id": user_id}, limit=limit)[0]
+        return [record.payload["data"] for record in records if "data" in record.payload]
+
+    collection = vector_store.collection
+    table = collection.table
+    query = (
+        select(table.c.metadata["data"].astext)
+        # Containment (@>) rather than the -> equality vecs uses for string values, since @> can use
+        # the GIN index on the metadata column
+        .where(table.c.metadata.contains({"user_id": user_id}))
+        .limit(limit)
+    )
+    with collection.client.Session() as session:
+        return [text for text in session.scalars(query) if text is not None]
+
+class WriteBatcher:
+    """
+    Coalesces concurrent saves into batched mem0 adds.
+
+    Texts submitted within `max_wait` seconds of the first pending one, up to `max_size` of them,
+    are handed to `write` together, so a burst of saves costs one LLM extraction instead of one
+    each. `write` is a blocking callable taking the list of texts and runs on a worker thread.
+    Every caller waits for the write its text was part of, and gets its return value or sees its
+    error if it fails.
+    """
+
+    def __init__(self, write, max_size: int = 16, max_wait: float = 0.05):
+        self.write = write
+        self.max_size = max_size
+        self.max_wait = max_wait
+        # Texts waiting to be written, each with the future its caller is awaiting
+        self._pending = []
+        self._timer = None
+        # Keeps running writes referenced until they finish
+        self._writes = set()
+
+    async def submit(self, text: str):
+        """Queue `text` for the next batch, wait until that batch is written and return the write's result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write(batch))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: list) -> None:
+        try:
+            result = await asyncio.to_thread(self.write, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(result)
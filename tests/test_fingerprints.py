@@ -0,0 +1,93 @@
+from utils import MemoryFingerprints
+
+USER_ID = "user"
+
+
+def test_normalized_copy_is_already_stored():
+    fingerprints = MemoryFingerprints()
+    fingerprints.load(USER_ID, ["I like  pizza"])
+
+    assert fingerprints.contains(USER_ID, "i like pizza")
+    assert fingerprints.contains(USER_ID, "  I LIKE PIZZA ")
+    assert not fingerprints.contains(USER_ID, "I like pasta")
+
+
+def test_changed_or_reordered_numbers_are_not_already_stored():
+    fingerprints = MemoryFingerprints()
+    fingerprints.load(USER_ID, [
+        "Dosage is 3.5 mg twice daily",
+        "Standup is at 10:45",
+        "Project Apollo deadline moved to March 15",
+    ])
+
+    for text in [
+        "Dosage is 5.3 mg twice daily",
+        "Standup is at 45:10",
+        "Project Apollo deadline moved to April 15",
+        "Project Apollo deadline NOT moved to March 15",
+    ]:
+        assert not fingerprints.contains(USER_ID, text)
+
+
+def test_least_recently_seen_is_evicted_at_max_entries():
+    fingerprints = MemoryFingerprints(max_entries=2)
+    fingerprints.load(USER_ID, ["a", "b"])
+    # Seeing "a" again makes "b" the least recently seen
+    assert fingerprints.contains(USER_ID, "a")
+    fingerprints.add(USER_ID, "c")
+
+    assert fingerprints.contains(USER_ID, "a")
+    assert not fingerprints.contains(USER_ID, "b")
+    assert fingerprints.contains(USER_ID, "c")
+
+
+def test_evicted_content_can_be_added_again():
+    fingerprints = MemoryFingerprints(max_entries=1)
+    fingerprints.load(USER_ID, ["a"])
+    fingerprints.add(USER_ID, "b")
+    assert not fingerprints.contains(USER_ID, "a")
+
+    fingerprints.add(USER_ID, "a")
+
+    assert fingerprints.contains(USER_ID, "a")
+    assert not fingerprints.contains(USER_ID, "b")
+
+
+def test_unknown_user_has_nothing_stored():
+    fingerprints = MemoryFingerprints()
+
+    assert not fingerprints.is_loaded(USER_ID)
+    assert not fingerprints.contains(USER_ID, "I like pizza")
+
+
+def test_users_are_kept_apart():
+    fingerprints = MemoryFingerprints()
+    fingerprints.load(USER_ID, ["I like pizza"])
+
+    assert not fingerprints.is_loaded("other")
+    assert not fingerprints.contains("other", "I like pizza")
+
+
+def test_add_before_load_does_not_count_as_loaded():
+    fingerprints = MemoryFingerprints()
+    fingerprints.add(USER_ID, "I like pizza")
+
+    assert not fingerprints.is_loaded(USER_ID)
+    assert fingerprints.contains(USER_ID, "I like pizza")
+
+
+def test_fingerprints_expire_after_ttl():
+    fingerprints = MemoryFingerprints(ttl=0)
+    fingerprints.load(USER_ID, ["a"])
+
+    assert not fingerprints.is_loaded(USER_ID)
+
+
+def test_forget_drops_the_users_fingerprints():
+    fingerprints = MemoryFingerprints()
+    fingerprints.load(USER_ID, ["a"])
+
+    fingerprints.forget(USER_ID)
+
+    assert not fingerprints.is_loaded(USER_ID)
+    assert not fingerprints.contains(USER_ID, "a")
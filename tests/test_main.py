@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+import asyncio
+
+from utils import MemoryFingerprints, SemanticQueryCache
+import main
+
+
+def test_save_that_added_memories_is_recorded():
+    fingerprints = MemoryFingerprints()
+
+    main._record_saved(fingerprints, {"results": [{"event": "ADD"}]}, ["I like pizza"])
+
+    assert fingerprints.contains(main.DEFAULT_USER_ID, "I like pizza")
+
+
+def test_save_that_added_nothing_is_not_recorded():
+    fingerprints = MemoryFingerprints()
+
+    main._record_saved(fingerprints, {"results": []}, ["I like pizza"])
+    main._record_saved(fingerprints, {"results": [{"event": "NONE"}]}, ["I like pizza"])
+    main._record_saved(fingerprints, [], ["I like pizza"])
+
+    assert not fingerprints.contains(main.DEFAULT_USER_ID, "I like pizza")
+
+
+def test_save_that_changed_stored_memories_forgets_fingerprints():
+    fingerprints = MemoryFingerprints()
+    fingerprints.load(main.DEFAULT_USER_ID, ["I like pizza"])
+
+    main._record_saved(fingerprints, {"results": [{"event": "ADD"}, {"event": "DELETE"}]}, ["I no longer like pizza"])
+
+    assert not fingerprints.is_loaded(main.DEFAULT_USER_ID)
+    assert not fingerprints.contains(main.DEFAULT_USER_ID, "I like pizza")
+    assert not fingerprints.contains(main.DEFAULT_USER_ID, "I no longer like pizza")
+
+
+def test_memories_are_flattened_and_deduplicated_in_either_response_shape():
+    items = [{"memory": "Likes pizza"}, {"memory": "likes  PIZZA"}, {"memory": "Lives in Berlin"}]
+
+    for response in [{"results": items}, items]:
+        memories = main._deduplicate_memories(main._flatten_memories(response))
+
+        assert memories == ["Likes pizza", "Lives in Berlin"]
+
+
+class StubMem0Client:
+    vector_store = None
+
+    def __init__(self):
+        self.added = []
+
+    def add(self, messages, user_id):
+        self.added.append([message["content"] for message in messages])
+        return {"results": [{"memory": message["content"], "event": "ADD"} for message in messages]}
+
+
+def _stub_context(mem0_client):
+    mem0_context = main.Mem0Context(
+        mem0_client=mem0_client,
+        search_cache=SemanticQueryCache(),
+        memory_fingerprints=MemoryFingerprints(),
+        write_batcher=None
+    )
+    return SimpleNamespace(request_context=SimpleNamespace(lifespan_context=mem0_context))
+
+
+def test_save_memory_batch_with_no_texts(monkeypatch):
+    monkeypatch.setattr(main, "get_memory_texts", lambda vector_store, user_id, limit: [])
+    mem0_client = StubMem0Client()
+
+    assert asyncio.run(main.save_memory_batch(_stub_context(mem0_client), [])) == "No memories to save"
+    assert mem0_client.added == []
+
+
+def test_save_memory_batch_drops_normalized_repeats(monkeypatch):
+    monkeypatch.setattr(main, "get_memory_texts", lambda vector_store, user_id, limit: [])
+    mem0_client = StubMem0Client()
+    ctx = _stub_context(mem0_client)
+
+    response = asyncio.run(main.save_memory_batch(ctx, ["a dog", "A DOG", "a cat"]))
+
+    assert response == "Successfully saved 2 memories"
+    assert mem0_client.added == [["a dog", "a cat"]]
+    assert asyncio.run(main.save_memory_batch(ctx, ["A  dog"])) == "All memories already exist"
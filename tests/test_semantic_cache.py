@@ -0,0 +1,69 @@
+from utils import SemanticQueryCache
+
+
+def test_similar_query_is_served_from_the_cache():
+    cache = SemanticQueryCache(threshold=0.95)
+    cache.put("Where does the user live?", [1, 0, 0], 3, ["Lives in Berlin"], cache.generation)
+
+    assert cache.get([1, 0.05, 0], 3) == ["Lives in Berlin"]
+    assert cache.get([0, 1, 0], 3) is None
+
+
+def test_put_with_stale_generation_caches_nothing():
+    cache = SemanticQueryCache()
+    # A write clears the cache while the search is still running
+    generation = cache.generation
+    cache.clear()
+
+    cache.put("Where does the user live?", [1, 0, 0], 3, ["Lives in Berlin"], generation)
+
+    assert cache.get_exact("Where does the user live?", 3) is None
+    assert cache.get([1, 0, 0], 3) is None
+
+
+def test_repeated_query_reuses_its_own_row():
+    cache = SemanticQueryCache()
+    cache.put("Where does the user live?", [1, 0, 0], 3, ["Lives in Berlin"], cache.generation)
+
+    cache.put("where does the user  live?", [1, 0, 0], 3, ["Lives in Paris"], cache.generation)
+
+    assert cache._size == 1
+    assert cache.get_exact("Where does the user live?", 3) == ["Lives in Paris"]
+
+
+def test_least_recently_used_is_evicted_at_max_entries():
+    cache = SemanticQueryCache(max_entries=2)
+    cache.put("a", [1, 0, 0], 3, ["A"], cache.generation)
+    cache.put("b", [0, 1, 0], 3, ["B"], cache.generation)
+    # Using "a" again makes "b" the least recently used
+    assert cache.get_exact("a", 3) == ["A"]
+
+    cache.put("c", [0, 0, 1], 3, ["C"], cache.generation)
+
+    assert cache.get_exact("a", 3) == ["A"]
+    assert cache.get_exact("b", 3) is None
+    assert cache.get([0, 1, 0], 3) is None
+    assert cache.get_exact("c", 3) == ["C"]
+
+
+def test_larger_limit_than_cached_misses():
+    cache = SemanticQueryCache()
+    cache.put("hobbies", [1, 0, 0], 2, ["Plays chess", "Runs"], cache.generation)
+
+    assert cache.get_exact("hobbies", 3) is None
+    assert cache.get([1, 0, 0], 3) is None
+    assert cache.get_exact("hobbies", 1) == ["Plays chess"]
+
+
+def test_expired_best_match_does_not_hide_a_fresh_match(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("utils.time.monotonic", lambda: now)
+    cache = SemanticQueryCache(threshold=0.95, ttl=60)
+    cache.put("Where does the user live?", [1, 0.05, 0], 3, ["Lives in Berlin"], cache.generation)
+    now += 30
+    cache.put("Which city is the user in?", [1, 0.1, 0], 3, ["Lives in Paris"], cache.generation)
+
+    # The first entry, the closest match, has expired, while the second is still fresh
+    now += 40
+
+    assert cache.get([1, 0, 0], 3) == ["Lives in Paris"]
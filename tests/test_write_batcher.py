@@ -0,0 +1,37 @@
+import asyncio
+
+from utils import WriteBatcher
+
+
+def test_batches_are_flushed_by_size_or_deadline():
+    batches = []
+
+    def write(texts):
+        batches.append(texts)
+        return {"results": [{"memory": text, "event": "ADD"} for text in texts]}
+
+    async def save_all():
+        batcher = WriteBatcher(write, max_size=3, max_wait=0.05)
+        return await asyncio.gather(*[batcher.submit(text) for text in ["a", "b", "c", "d", "e"]])
+
+    results = asyncio.run(save_all())
+
+    # The first three fill a batch and are written at once, the last two when the window closes
+    assert batches == [["a", "b", "c"], ["d", "e"]]
+    # Every caller gets the result of the write its text was part of
+    assert results[0] is results[1] is results[2]
+    assert results[3] is results[4]
+    assert [item["memory"] for item in results[3]["results"]] == ["d", "e"]
+
+
+def test_write_error_reaches_every_caller():
+    error = RuntimeError("database unavailable")
+
+    def write(texts):
+        raise error
+
+    async def save_all():
+        batcher = WriteBatcher(write, max_size=16, max_wait=0.01)
+        return await asyncio.gather(*[batcher.submit(text) for text in ["a", "b", "c"]], return_exceptions=True)
+
+    assert asyncio.run(save_all()) == [error, error, error]